@@ -51,6 +51,40 @@ async function getRoomHost(roomId) {
   }
 }
 
+// Remove a socket from a room, handing the host role to the next
+// participant or dropping the room once empty. Returns false if the room
+// no longer exists.
+function removeFromRoom(roomID, socketId) {
+  const remaining = (rooms[roomID] || []).filter(
+    (user) => user.id !== socketId
+  );
+  if (remaining.length === 0) {
+    delete rooms[roomID];
+    roomHosts.delete(roomID);
+    return false;
+  }
+
+  rooms[roomID] = remaining;
+  if (roomHosts.get(roomID) === socketId) {
+    const nextHost = remaining[0];
+    roomHosts.set(roomID, nextHost.id);
+    io.to(roomID).emit("host_changed", { newHostId: nextHost.id });
+  }
+  return true;
+}
+
+// Take a socket out of the room it joined, if any
+function leaveRoom(socket) {
+  const roomID = socket.data.roomID;
+  if (!roomID) return;
+
+  delete socket.data.roomID;
+  socket.leave(roomID);
+  if (removeFromRoom(roomID, socket.id)) {
+    socket.to(roomID).emit("user left", socket.id);
+  }
+}
+
 io.on("connection", (socket) => {
   console.log("New client connected:", socket.id);
 
@@ -109,6 +143,12 @@ io.on("connection", (socket) => {
   socket.on("join room", async ({ roomID, userName, isMuted, isCameraOff }) => {
     console.log(`User ${userName} joining room ${roomID}`);
 
+    // Already in this room; nothing to do
+    if (socket.data.roomID === roomID) return;
+
+    // A socket sits in one room at a time, so leave any previous one first
+    leaveRoom(socket);
+
     let isHost = false;
 
     // Check if room exists in memory
@@ -116,6 +156,8 @@ io.on("connection", (socket) => {
       rooms[roomID] = [];
       // Check if room exists in database
       const existingHostId = await getRoomHost(roomID);
+      // The room may have emptied and been dropped while we were waiting
+      rooms[roomID] = rooms[roomID] || [];
       if (!existingHostId) {
         // This is a new room, make this user the host
         isHost = true;
@@ -134,6 +176,15 @@ io.on("connection", (socket) => {
       isHost = roomHosts.get(roomID) === socket.id;
     }
 
+    // The client may have dropped while we were looking up the host
+    if (socket.disconnected) {
+      removeFromRoom(roomID, socket.id);
+      return;
+    }
+
+    // Remember the room so later events and cleanup don't scan every room
+    socket.data.roomID = roomID;
+
     // Add user to room
     rooms[roomID].push({
       id: socket.id,
@@ -197,42 +248,33 @@ io.on("connection", (socket) => {
 
   // Handle mute status changes
   socket.on("mute_status", ({ isMuted }) => {
-    Object.keys(rooms).forEach((roomID) => {
-      const userIndex = rooms[roomID].findIndex(
-        (user) => user.id === socket.id
-      );
-      if (userIndex !== -1) {
-        rooms[roomID][userIndex].isMuted = isMuted;
-        socket.to(roomID).emit("peer_mute_status", {
-          peerId: socket.id,
-          isMuted,
-        });
-      }
-    });
+    const roomID = socket.data.roomID;
+    const user = rooms[roomID]?.find((user) => user.id === socket.id);
+    if (user) {
+      user.isMuted = isMuted;
+      socket.to(roomID).emit("peer_mute_status", {
+        peerId: socket.id,
+        isMuted,
+      });
+    }
   });
 
   // Handle camera status changes
   socket.on("camera_status", ({ isCameraOff }) => {
-    Object.keys(rooms).forEach((roomID) => {
-      const userIndex = rooms[roomID].findIndex(
-        (user) => user.id === socket.id
-      );
-      if (userIndex !== -1) {
-        rooms[roomID][userIndex].isCameraOff = isCameraOff;
-        socket.to(roomID).emit("peer_camera_status", {
-          peerId: socket.id,
-          isCameraOff,
-        });
-      }
-    });
+    const roomID = socket.data.roomID;
+    const user = rooms[roomID]?.find((user) => user.id === socket.id);
+    if (user) {
+      user.isCameraOff = isCameraOff;
+      socket.to(roomID).emit("peer_camera_status", {
+        peerId: socket.id,
+        isCameraOff,
+      });
+    }
   });
 
   // Handle message delivery confirmation
   socket.on("message_delivered", ({ messageId, userName }) => {
-    // Find the room this user is in
-    const roomID = Object.keys(rooms).find((roomID) =>
-      rooms[roomID].some((user) => user.id === socket.id)
-    );
+    const roomID = socket.data.roomID;
 
     if (roomID) {
       // Notify the message sender
@@ -282,33 +324,7 @@ io.on("connection", (socket) => {
   socket.on("disconnect", () => {
     console.log("Client disconnected:", socket.id);
 
-    // Check if this socket was a host
-    for (const [roomId, hostId] of roomHosts.entries()) {
-      if (hostId === socket.id) {
-        // Remove host status
-        roomHosts.delete(roomId);
-
-        // If there are other users in the room, assign host to the next user
-        if (rooms[roomId]?.length > 1) {
-          const nextHost = rooms[roomId].find((user) => user.id !== socket.id);
-          if (nextHost) {
-            roomHosts.set(roomId, nextHost.id);
-            io.to(roomId).emit("host_changed", { newHostId: nextHost.id });
-          }
-        }
-      }
-    }
-
-    // Remove from rooms
-    Object.keys(rooms).forEach((roomID) => {
-      rooms[roomID] = rooms[roomID]?.filter((user) => user.id !== socket.id);
-      if (rooms[roomID]?.length === 0) {
-        delete rooms[roomID];
-        roomHosts.delete(roomID);
-      } else {
-        socket.to(roomID).emit("user left", socket.id);
-      }
-    });
+    leaveRoom(socket);
   });
 });
 